@@ -3,29 +3,71 @@
 # Author: Georgios Douzas <gdouzas@icloud.com>
 # License: BSD 3 clause
 
+import numbers
+
 import numpy as np
 from numpy.linalg import norm
-from sklearn.utils import check_random_state
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.utils import check_random_state, gen_batches
 from imblearn.over_sampling.base import BaseOverSampler
 from imblearn.utils import check_neighbors_object, Substitution
-from imblearn.utils._docstring import _random_state_docstring
 
 SELECTION_STRATEGY = ('combined', 'majority', 'minority')
+BATCH_SIZE = 4096
 
 
-def _make_geometric_sample(
-    center, surface_point, truncation_factor, deformation_factor, random_state
+def _check_generator(random_state):
+    """Turn seed into a np.random.Generator instance.
+
+    Parameters
+    ----------
+    random_state : int, RandomState instance, Generator instance or None
+        If ``Generator`` instance, it is returned unchanged. If int, it is
+        used to seed a new ``Generator``. If ``RandomState`` instance or None,
+        a new ``Generator`` is seeded from it or from the global ``RandomState``
+        singleton respectively.
+
+    Returns
+    -------
+    generator : Generator instance
+        The random numbers generator.
+
+    """
+    if isinstance(random_state, np.random.Generator):
+        return random_state
+    if isinstance(random_state, numbers.Integral):
+        return np.random.default_rng(random_state)
+    random_state = check_random_state(random_state)
+    return np.random.default_rng(random_state.randint(np.iinfo(np.int32).max))
+
+
+def _get_samples_dtype(X):
+    """Return the floating point data type of samples generated from X.
+
+    Single precision input is preserved, otherwise double precision is used.
+
+    """
+    return np.float32 if X.dtype == np.float32 else np.float64
+
+
+def _make_geometric_points(
+    centers,
+    surface_points,
+    truncation_factor,
+    deformation_factor,
+    random_state,
+    out=None,
 ):
-    """A support function that returns an artificial point inside
-    the geometric region defined by the center and surface points.
+    """A support function that returns artificial points inside the
+    geometric regions defined by pairs of center and surface points.
 
     Parameters
     ----------
-    center : ndarray, shape (n_features, )
-        Center point of the geometric region.
+    centers : ndarray, shape (n_samples, n_features)
+        Center points of the geometric regions.
 
-    surface_point : ndarray, shape (n_features, )
-        Surface point of the geometric region.
+    surface_points : ndarray, shape (n_samples, n_features)
+        Surface points of the geometric regions.
 
     truncation_factor : float, optional (default=0.0)
         The type of truncation. The values should be in the [-1.0, 1.0] range.
@@ -33,58 +75,104 @@ def _make_geometric_sample(
     deformation_factor : float, optional (default=0.0)
         The type of geometry. The values should be in the [0.0, 1.0] range.
 
-    random_state : int, RandomState instance or None
+    random_state : int, RandomState instance, Generator instance or None
         Control the randomization of the algorithm.
 
+    out : ndarray, shape (n_samples, n_features), optional (default=None)
+        Floating point array where the generated samples are written. If
+        ``None``, a new array is allocated.
+
     Returns
     -------
-    point : ndarray, shape (n_features, )
-            Synthetically generated sample.
+    points : ndarray, shape (n_samples, n_features)
+            Synthetically generated samples.
 
     """
 
-    # Zero radius case
-    if np.array_equal(center, surface_point):
-        return center
+    n_samples, n_features = centers.shape
+    generator = _check_generator(random_state)
+
+    if out is None:
+        out = np.empty((n_samples, n_features), dtype=_get_samples_dtype(centers))
+    points, dtype = out, out.dtype
 
-    # Generate a point on the surface of a unit hyper-sphere
-    radius = norm(center - surface_point)
-    normal_samples = random_state.normal(size=center.size)
-    point_on_unit_sphere = normal_samples / norm(normal_samples)
-    point = (random_state.uniform(size=1) ** (1 / center.size)) * point_on_unit_sphere
+    # Generate points inside unit hyper-spheres
+    scales = np.empty(n_samples, dtype=dtype)
+    generator.standard_normal(dtype=dtype, out=points)
+    generator.random(dtype=dtype, out=scales)
+    scales **= 1 / n_features
+    scales /= np.sqrt(np.einsum('ij,ij->i', points, points))
+    points *= scales[:, None]
 
-    # Parallel unit vector
-    parallel_unit_vector = (surface_point - center) / norm(surface_point - center)
+    # Radii and parallel unit vectors, zero radius regions collapse to centers
+    parallel_unit_vectors = np.subtract(surface_points, centers, dtype=dtype)
+    radii = np.sqrt(np.einsum('ij,ij->i', parallel_unit_vectors, parallel_unit_vectors))
+    nonzero = radii > 0
+    parallel_unit_vectors[nonzero] /= radii[nonzero, None]
 
     # Truncation
-    close_to_opposite_boundary = (
-        truncation_factor > 0
-        and np.dot(point, parallel_unit_vector) < truncation_factor - 1
+    dot_products = np.einsum('ij,ij->i', points, parallel_unit_vectors)
+    close_to_opposite_boundary = (truncation_factor > 0) & (
+        dot_products < truncation_factor - 1
     )
-    close_to_boundary = (
-        truncation_factor < 0
-        and np.dot(point, parallel_unit_vector) > truncation_factor + 1
-    )
-    if close_to_opposite_boundary or close_to_boundary:
-        point -= 2 * np.dot(point, parallel_unit_vector) * parallel_unit_vector
-
-    # Deformation
-    parallel_point_position = np.dot(point, parallel_unit_vector) * parallel_unit_vector
-    perpendicular_point_position = point - parallel_point_position
-    point = (
-        parallel_point_position
-        + (1 - deformation_factor) * perpendicular_point_position
+    close_to_boundary = (truncation_factor < 0) & (dot_products > truncation_factor + 1)
+    reflected = close_to_opposite_boundary | close_to_boundary
+    points[reflected] -= (
+        2 * dot_products[reflected, None] * parallel_unit_vectors[reflected]
     )
 
+    # Deformation and scaling, shrink the perpendicular component in place
+    dot_products = np.einsum('ij,ij->i', points, parallel_unit_vectors)
+    dot_products *= deformation_factor * radii
+    points *= ((1 - deformation_factor) * radii)[:, None]
+    points += dot_products[:, None] * parallel_unit_vectors
+
     # Translation
-    point = center + radius * point
+    points += centers
+
+    return points
+
+
+def _make_geometric_sample(
+    center, surface_point, truncation_factor, deformation_factor, random_state
+):
+    """A support function that returns an artificial point inside
+    the geometric region defined by the center and surface points.
 
-    return point
+    Parameters
+    ----------
+    center : ndarray, shape (n_features, )
+        Center point of the geometric region.
+
+    surface_point : ndarray, shape (n_features, )
+        Surface point of the geometric region.
+
+    truncation_factor : float, optional (default=0.0)
+        The type of truncation. The values should be in the [-1.0, 1.0] range.
+
+    deformation_factor : float, optional (default=0.0)
+        The type of geometry. The values should be in the [0.0, 1.0] range.
+
+    random_state : int, RandomState instance, Generator instance or None
+        Control the randomization of the algorithm.
+
+    Returns
+    -------
+    point : ndarray, shape (n_features, )
+            Synthetically generated sample.
+
+    """
+    return _make_geometric_points(
+        center.reshape(1, -1),
+        surface_point.reshape(1, -1),
+        truncation_factor,
+        deformation_factor,
+        random_state,
+    )[0]
 
 
 @Substitution(
     sampling_strategy=BaseOverSampler._sampling_strategy_docstring,
-    random_state=_random_state_docstring,
 )
 class GeometricSMOTE(BaseOverSampler):
     """Class to to perform over-sampling using Geometric SMOTE.
@@ -98,7 +186,17 @@ class GeometricSMOTE(BaseOverSampler):
     ----------
     {sampling_strategy}
 
-    {random_state}
+    random_state : int, RandomState, Generator or None, optional (default=None)
+        Control the randomization of the algorithm.
+
+        - If int, ``random_state`` is the seed used to create a
+          ``np.random.Generator``;
+        - If ``RandomState`` instance, a ``np.random.Generator`` is seeded
+          from it;
+        - If ``Generator`` instance, it is used as the random number
+          generator;
+        - If ``None``, a ``np.random.Generator`` is seeded from the
+          ``RandomState`` instance used by ``np.random``.
 
     truncation_factor : float, optional (default=0.0)
         The type of truncation. The values should be in the [-1.0, 1.0] range.
@@ -119,6 +217,12 @@ class GeometricSMOTE(BaseOverSampler):
     n_jobs : int, optional (default=1)
         The number of threads to open if possible.
 
+    Attributes
+    ----------
+    random_state_ : Generator instance
+        The ``np.random.Generator`` used to generate the synthetic samples,
+        created from ``random_state`` at each call of ``fit_resample``.
+
     Notes
     -----
     See the original paper: [1]_ for more details.
@@ -155,6 +259,12 @@ class GeometricSMOTE(BaseOverSampler):
 
     """
 
+    # Accept generators when scikit-learn validates the parameters
+    _parameter_constraints = {
+        **getattr(BaseOverSampler, '_parameter_constraints', {}),
+        'random_state': ['random_state', np.random.Generator],
+    }
+
     def __init__(
         self,
         sampling_strategy='auto',
@@ -177,7 +287,7 @@ class GeometricSMOTE(BaseOverSampler):
         """Create the necessary attributes for Geometric SMOTE."""
 
         # Check random state
-        self.random_state_ = check_random_state(self.random_state)
+        self.random_state_ = _check_generator(self.random_state)
 
         # Validate strategy
         if self.selection_strategy not in SELECTION_STRATEGY:
@@ -189,6 +299,15 @@ class GeometricSMOTE(BaseOverSampler):
                 error_msg.format(SELECTION_STRATEGY, self.selection_strategy)
             )
 
+        # Reuse nearest neighbors objects created from unchanged parameters
+        nn_params = (self.selection_strategy, self.k_neighbors, self.n_jobs)
+        if (
+            isinstance(self.k_neighbors, numbers.Integral)
+            and getattr(self, '_nn_params', None) == nn_params
+        ):
+            return
+        self._nn_params = nn_params
+
         # Create nearest neighbors object for positive class
         if self.selection_strategy in ('minority', 'combined'):
             self.nns_pos_ = check_neighbors_object(
@@ -201,7 +320,64 @@ class GeometricSMOTE(BaseOverSampler):
             self.nn_neg_ = check_neighbors_object('nn_negative', nn_object=1)
             self.nn_neg_.set_params(n_jobs=self.n_jobs)
 
-    def _make_geometric_samples(self, X, y, pos_class_label, n_samples):
+    def _make_geometric_batch(
+        self, X_pos, X_neg, points_pos, points_neg, rows, cols, generator, out
+    ):
+        """A support function that generates a batch of artificial samples
+        from the sampled rows and columns of the neighbors matrix.
+
+        Parameters
+        ----------
+        X_pos : ndarray, shape (n_samples_pos, n_features)
+            Positive class samples.
+        X_neg : ndarray, shape (n_samples_neg, n_features) or None
+            Negative class samples, ``None`` for the minority strategy.
+        points_pos : ndarray, shape (n_samples_pos, k_neighbors) or None
+            Positive class neighbors, ``None`` for the majority strategy.
+        points_neg : ndarray, shape (n_samples_pos, 1) or None
+            Negative class neighbors, ``None`` for the minority strategy.
+        rows : ndarray, shape (n_samples_batch, )
+            Rows of the sampled neighbors, i.e. indices of the center points.
+        cols : ndarray, shape (n_samples_batch, )
+            Columns of the sampled neighbors.
+        generator : Generator instance
+            The random numbers generator of the batch.
+        out : ndarray, shape (n_samples_batch, n_features)
+            Floating point array where the synthetic samples are written.
+
+        """
+
+        # Define center points
+        centers = X_pos[rows]
+
+        # Minority strategy
+        if self.selection_strategy_ == 'minority':
+            surface_points = X_pos[points_pos[rows, cols]]
+
+        # Majority strategy
+        elif self.selection_strategy_ == 'majority':
+            surface_points = X_neg[points_neg[rows, cols]]
+
+        # Combined strategy
+        else:
+            surface_points = X_pos[points_pos[rows, cols]]
+            surface_points_neg = X_neg[points_neg[rows, 0]]
+            radii_pos = norm(centers - surface_points, axis=1)
+            radii_neg = norm(centers - surface_points_neg, axis=1)
+            closer_neg = radii_pos > radii_neg
+            surface_points[closer_neg] = surface_points_neg[closer_neg]
+
+        # Generate new samples
+        _make_geometric_points(
+            centers,
+            surface_points,
+            self.truncation_factor,
+            self.deformation_factor,
+            generator,
+            out=out,
+        )
+
+    def _make_geometric_samples(self, X, y, pos_class_label, n_samples, out=None):
         """A support function that returns an artificials samples inside
         the geometric region defined by nearest neighbors.
 
@@ -215,6 +391,8 @@ class GeometricSMOTE(BaseOverSampler):
             The minority class (positive class) target value.
         n_samples : int
             The number of samples to generate.
+        out : ndarray, shape (n_samples, n_features), optional (default=None)
+            Floating point array where the synthetic samples are written.
 
         Returns
         -------
@@ -241,63 +419,57 @@ class GeometricSMOTE(BaseOverSampler):
         )
 
         # Minority or combined strategy
+        X_neg = points_pos = points_neg = None
         if self.selection_strategy_ in ('minority', 'combined'):
             self.nns_pos_.fit(X_pos)
-            points_pos = self.nns_pos_.kneighbors(X_pos)[1][:, 1:]
-            samples_indices = self.random_state_.randint(
-                low=0, high=len(points_pos.flatten()), size=n_samples
+            points_pos = self.nns_pos_.kneighbors(
+                n_neighbors=self.nns_pos_.n_neighbors - 1, return_distance=False
             )
-            rows = np.floor_divide(samples_indices, points_pos.shape[1])
-            cols = np.mod(samples_indices, points_pos.shape[1])
 
         # Majority or combined strategy
         if self.selection_strategy_ in ('majority', 'combined'):
             X_neg = X[y != pos_class_label]
             self.nn_neg_.fit(X_neg)
-            points_neg = self.nn_neg_.kneighbors(X_pos)[1]
-            if self.selection_strategy_ == 'majority':
-                samples_indices = self.random_state_.randint(
-                    low=0, high=len(points_neg.flatten()), size=n_samples
-                )
-                rows = np.floor_divide(samples_indices, points_neg.shape[1])
-                cols = np.mod(samples_indices, points_neg.shape[1])
+            points_neg = self.nn_neg_.kneighbors(X_pos, return_distance=False)
 
-        # Generate new samples
-        X_new = np.zeros((n_samples, X.shape[1]))
-        for ind, (row, col) in enumerate(zip(rows, cols)):
-
-            # Define center point
-            center = X_pos[row]
-
-            # Minority strategy
-            if self.selection_strategy_ == 'minority':
-                surface_point = X_pos[points_pos[row, col]]
-
-            # Majority strategy
-            elif self.selection_strategy_ == 'majority':
-                surface_point = X_neg[points_neg[row, col]]
-
-            # Combined strategy
-            else:
-                surface_point_pos = X_pos[points_pos[row, col]]
-                surface_point_neg = X_neg[points_neg[row, 0]]
-                radius_pos = norm(center - surface_point_pos)
-                radius_neg = norm(center - surface_point_neg)
-                surface_point = (
-                    surface_point_neg if radius_pos > radius_neg else surface_point_pos
-                )
-
-            # Append new sample
-            X_new[ind] = _make_geometric_sample(
-                center,
-                surface_point,
-                self.truncation_factor,
-                self.deformation_factor,
-                self.random_state_,
+        # Sample neighbors of the selected strategy
+        points = points_neg if self.selection_strategy_ == 'majority' else points_pos
+        samples_indices = self.random_state_.integers(
+            low=0, high=points.size, size=n_samples, dtype=np.intp
+        )
+        rows, cols = np.divmod(samples_indices, points.shape[1])
+
+        # Allocate new samples
+        if out is None:
+            out = np.empty((n_samples, X.shape[1]), dtype=_get_samples_dtype(X))
+
+        # Generate new samples in fixed size batches, each with its own generator,
+        # so that the result does not depend on n_jobs
+        batches = list(gen_batches(n_samples, BATCH_SIZE))
+        seed_sequence = np.random.SeedSequence(
+            self.random_state_.integers(np.iinfo(np.int64).max)
+        )
+        generators = [
+            np.random.default_rng(seed) for seed in seed_sequence.spawn(len(batches))
+        ]
+        n_jobs = min(effective_n_jobs(self.n_jobs), len(batches))
+        Parallel(n_jobs=n_jobs, require='sharedmem')(
+            delayed(self._make_geometric_batch)(
+                X_pos,
+                X_neg,
+                points_pos,
+                points_neg,
+                rows[batch],
+                cols[batch],
+                generator,
+                out[batch],
             )
+            for batch, generator in zip(batches, generators)
+        )
+        X_new = out
 
         # Create new samples for target variable
-        y_new = np.array([pos_class_label] * len(samples_indices))
+        y_new = np.full(n_samples, pos_class_label, dtype=y.dtype)
 
         return X_new, y_new
 
@@ -306,19 +478,24 @@ class GeometricSMOTE(BaseOverSampler):
         # Validate estimator's parameters
         self._validate_estimator()
 
-        # Copy data
-        X_resampled, y_resampled = X.copy(), y.copy()
+        # Allocate resampled data
+        n_samples_new = sum(self.sampling_strategy_.values())
+        X_resampled = np.empty(
+            (len(X) + n_samples_new, X.shape[1]), dtype=_get_samples_dtype(X)
+        )
+        y_resampled = np.empty(len(y) + n_samples_new, dtype=y.dtype)
+        X_resampled[: len(X)], y_resampled[: len(y)] = X, y
 
         # Resample data
+        start = len(X)
         for class_label, n_samples in self.sampling_strategy_.items():
+            end = start + n_samples
 
-            # Apply gsmote mechanism
-            X_new, y_new = self._make_geometric_samples(X, y, class_label, n_samples)
-
-            # Append new data
-            X_resampled, y_resampled = (
-                np.vstack((X_resampled, X_new)),
-                np.hstack((y_resampled, y_new)),
+            # Apply gsmote mechanism, synthetic samples are written in place
+            _, y_new = self._make_geometric_samples(
+                X, y, class_label, n_samples, out=X_resampled[start:end]
             )
+            y_resampled[start:end] = y_new
+            start = end
 
         return X_resampled, y_resampled
@@ -7,10 +7,18 @@ from collections import Counter
 import pytest
 import numpy as np
 from numpy.linalg import norm
+from joblib import parallel_backend
 from sklearn.utils import check_random_state
 from sklearn.datasets import make_classification
 
-from ..geometric_smote import _make_geometric_sample, GeometricSMOTE, SELECTION_STRATEGY
+from ..geometric_smote import (
+    _check_generator,
+    _make_geometric_sample,
+    _make_geometric_points,
+    GeometricSMOTE,
+    SELECTION_STRATEGY,
+    BATCH_SIZE,
+)
 
 RND_SEED = 0
 RANDOM_STATE = check_random_state(RND_SEED)
@@ -30,6 +38,21 @@ TRUNCATION_FACTORS = [-1.0, -0.5, 0.0, 0.5, 1.0]
 DEFORMATION_FACTORS = [0.0, 0.25, 0.5, 0.75, 1.0]
 
 
+@pytest.mark.parametrize('random_state', [None, RND_SEED, check_random_state(RND_SEED)])
+def test_check_generator(random_state):
+    """Test the conversion of random states to generators."""
+    generator = _check_generator(random_state)
+    assert isinstance(generator, np.random.Generator)
+    assert _check_generator(generator) is generator
+
+
+def test_check_generator_seed():
+    """Test the reproducibility of generators created from a seed."""
+    np.testing.assert_array_equal(
+        _check_generator(RND_SEED).random(5), _check_generator(RND_SEED).random(5)
+    )
+
+
 @pytest.mark.parametrize(
     'center,surface_point',
     [
@@ -91,6 +114,53 @@ def test_make_geometric_sample_line_segment(center, surface_point, truncation_fa
     np.testing.assert_allclose(np.abs(dot_product) / norms_product, 1.0)
 
 
+@pytest.mark.parametrize(
+    'truncation_factor,deformation_factor',
+    [
+        (truncation_factor, deformation_factor)
+        for truncation_factor in TRUNCATION_FACTORS
+        for deformation_factor in DEFORMATION_FACTORS
+    ],
+)
+def test_make_geometric_points(truncation_factor, deformation_factor):
+    """Test the generation of multiple points inside hyperspheres."""
+    centers = RANDOM_STATE.random_sample((50, 3))
+    surface_points = centers + RANDOM_STATE.uniform(-1.0, 1.0, (50, 3))
+    surface_points[0] = centers[0]
+    points = _make_geometric_points(
+        centers, surface_points, truncation_factor, deformation_factor, RANDOM_STATE
+    )
+    assert points.shape == centers.shape
+    np.testing.assert_array_equal(points[0], centers[0])
+    np.testing.assert_array_less(
+        norm(points - centers, axis=1) - 1e-10,
+        norm(surface_points - centers, axis=1),
+    )
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64, np.int64])
+def test_make_geometric_points_dtype(dtype):
+    """Test the data type of the generated points."""
+    centers = np.zeros((10, 3), dtype=dtype)
+    surface_points = np.ones((10, 3), dtype=dtype)
+    points = _make_geometric_points(
+        centers, surface_points, 0.0, 0.0, check_random_state(RND_SEED)
+    )
+    assert points.dtype == (np.float32 if dtype == np.float32 else np.float64)
+
+
+def test_make_geometric_points_out():
+    """Test the generation of points into a preallocated array."""
+    centers = np.zeros((10, 3))
+    surface_points = np.ones((10, 3))
+    out = np.empty((10, 3))
+    points = _make_geometric_points(
+        centers, surface_points, 0.0, 0.0, check_random_state(RND_SEED), out=out
+    )
+    assert points is out
+    np.testing.assert_array_less(norm(points, axis=1), norm(surface_points, axis=1))
+
+
 def test_gsmote_default_init():
     """Test the intialization with default parameters."""
     gsmote = GeometricSMOTE()
@@ -207,3 +277,80 @@ def test_gsmote_fit_resample_multiclass(
     assert majority_label not in gsmote.sampling_strategy_.keys()
     np.testing.assert_array_equal(np.unique(y), np.unique(y_resampled))
     assert len(set(Counter(y_resampled).values())) == 1
+
+
+@pytest.mark.parametrize('selection_strategy', SELECTION_STRATEGY)
+def test_gsmote_fit_resample_float32(selection_strategy):
+    """Test that single precision data are preserved."""
+    n_samples, weights = 200, [0.6, 0.4]
+    X, y = make_classification(
+        random_state=RND_SEED, n_samples=n_samples, weights=weights
+    )
+    gsmote = GeometricSMOTE(
+        random_state=RND_SEED, selection_strategy=selection_strategy
+    )
+    X_resampled, _ = gsmote.fit_resample(X.astype(np.float32), y)
+    assert X_resampled.dtype == np.float32
+
+
+@pytest.mark.parametrize(
+    'n_jobs,backend',
+    [(n_jobs, backend) for n_jobs in (2, -1) for backend in ('threading', 'loky')],
+)
+def test_gsmote_n_jobs(n_jobs, backend):
+    """Test that parallel sample generation does not depend on n_jobs."""
+    n_samples, weights = 10000, [0.9, 0.1]
+    X, y = make_classification(
+        random_state=RND_SEED, n_samples=n_samples, weights=weights
+    )
+    with parallel_backend(backend):
+        X_resampled, y_resampled = GeometricSMOTE(
+            random_state=RND_SEED, n_jobs=n_jobs
+        ).fit_resample(X, y)
+    X_resampled_sequential, y_resampled_sequential = GeometricSMOTE(
+        random_state=RND_SEED, n_jobs=1
+    ).fit_resample(X, y)
+    assert len(X_resampled) - n_samples > BATCH_SIZE
+    np.testing.assert_array_equal(X_resampled, X_resampled_sequential)
+    np.testing.assert_array_equal(y_resampled, y_resampled_sequential)
+
+
+def test_gsmote_fit_resample_string_labels():
+    """Test that the data type of string labels is preserved."""
+    n_samples, weights = 200, [0.6, 0.4]
+    X, y = make_classification(
+        random_state=RND_SEED, n_samples=n_samples, weights=weights
+    )
+    y = np.array(['maj', 'min'])[y]
+    _, y_resampled = GeometricSMOTE(random_state=RND_SEED).fit_resample(X, y)
+    assert y_resampled.dtype == y.dtype
+    assert Counter(y_resampled) == {'maj': 120, 'min': 120}
+
+
+def test_gsmote_nn_reuse():
+    """Test the reuse of nearest neighbors objects across fits."""
+    n_samples, weights = 200, [0.6, 0.4]
+    X, y = make_classification(
+        random_state=RND_SEED, n_samples=n_samples, weights=weights
+    )
+    gsmote = GeometricSMOTE(random_state=RND_SEED)
+    gsmote.fit_resample(X, y)
+    nns_pos, nn_neg = gsmote.nns_pos_, gsmote.nn_neg_
+    gsmote.fit_resample(X, y)
+    assert gsmote.nns_pos_ is nns_pos and gsmote.nn_neg_ is nn_neg
+    gsmote.set_params(k_neighbors=3).fit_resample(X, y)
+    assert gsmote.nns_pos_ is not nns_pos
+    assert gsmote.nns_pos_.n_neighbors == 4
+
+
+def test_gsmote_generator_random_state():
+    """Test the use of a generator as random state."""
+    n_samples, weights = 200, [0.6, 0.4]
+    X, y = make_classification(
+        random_state=RND_SEED, n_samples=n_samples, weights=weights
+    )
+    generator = np.random.default_rng(RND_SEED)
+    gsmote = GeometricSMOTE(random_state=generator)
+    _, y_resampled = gsmote.fit_resample(X, y)
+    assert gsmote.random_state_ is generator
+    assert Counter(y_resampled) == {0: 120, 1: 120}
@@ -20,7 +20,7 @@ URL = 'https://github.com/AlgoWit/geometric-smote'
 LICENSE = 'MIT'
 DOWNLOAD_URL = 'https://github.com/AlgoWit/geometric-smote'
 VERSION = __version__
-INSTALL_REQUIRES = ['scipy>=0.17', 'numpy>=1.1', 'scikit-learn>=0.21', 'imbalanced-learn>=0.4.3']
+INSTALL_REQUIRES = ['scipy>=0.17', 'numpy>=1.17', 'scikit-learn>=0.21', 'imbalanced-learn>=0.4.3', 'joblib>=0.12']
 CLASSIFIERS = ['Intended Audience :: Science/Research',
                'Intended Audience :: Developers',
                'License :: OSI Approved',